@@ -2,20 +2,35 @@ import os
 import sys
 import time
 import datetime
+import uuid
+import hashlib
 import cv2
-import base64
+import pybase64
 import requests
+from requests.adapters import HTTPAdapter
 import json
-import sqlite3
+import orjson
+import queue
+import threading
+import atexit
+from urllib.parse import quote
+import logging
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from flask import Flask, jsonify, request, send_file, Response
+from flask import Flask, jsonify, request, send_file, Response, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
 # Add parent directory to path to import main.py functions
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(parent_dir)
 
+# Database connection helpers
+from db import read_connection, write_connection, start_wal_checkpointer
+
 # Import functions from main.py
 from main import (
     initialize_client, 
@@ -27,29 +42,56 @@ from main import (
 # Load environment variables
 load_dotenv()
 
+# Configure logging: request threads only enqueue records, a background listener writes them
+# Set LOG_LEVEL=INFO or DEBUG in the environment for more detail
+logger = logging.getLogger('wyze')
+logger.setLevel(os.getenv("LOG_LEVEL", "WARNING").upper())
+_log_queue = queue.Queue(-1)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# JSON provider that uses orjson for jsonify() and request.get_json()
+class OrjsonProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configure CORS more explicitly
 CORS(app, resources={
     r"/api/*": {
         "origins": "*",  # Allow all origins
+        "send_wildcard": True,  # Send a literal '*' instead of echoing the Origin
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization"],
+        "max_age": 86400  # Let browsers cache preflight responses (clamped to their own maximum)
     }
 })
 
 # Add a before_request handler to log all incoming requests
 @app.before_request
 def before_request():
-    print(f"\n==== INCOMING REQUEST ====")
-    print(f"Method: {request.method}")
-    print(f"Path: {request.path}")
+    g._t0 = time.perf_counter()
+    logger.info("Incoming request: %s %s", request.method, request.path)
+    
+    # Headers and request bodies are only collected when debug logging is on
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
     
     # Only print selected headers, not all to reduce log spam
     important_headers = {k: v for k, v in request.headers.items() 
                          if k.lower() in ['content-type', 'content-length', 'accept']}
-    print(f"Headers: {important_headers}")
+    logger.debug("Headers: %s", important_headers)
     
     # Don't log data for file uploads or multipart form data
     content_type = request.headers.get('Content-Type', '')
@@ -57,81 +99,141 @@ def before_request():
         # Only log JSON data, not binary data
         if 'application/json' in content_type:
             try:
-                print(f"Data: {request.get_json()}")
+                logger.debug("Data: %s", request.get_json())
             except:
-                print("Data: [Unable to parse JSON]")
+                logger.debug("Data: [Unable to parse JSON]")
         else:
-            print("Data: [Not logged - not JSON]")
+            logger.debug("Data: [Not logged - not JSON]")
             
-# Add an after_request handler to check CORS headers
+# Add an after_request handler to log responses; CORS headers come from flask-cors above
 @app.after_request
 def after_request(response):
-    print(f"\n==== OUTGOING RESPONSE ====")
-    print(f"Status: {response.status}")
-    print(f"Headers: {dict(response.headers)}")
-    
-    # Only add CORS headers if they're not already present
-    if 'Access-Control-Allow-Origin' not in response.headers:
-        response.headers.add('Access-Control-Allow-Origin', '*')
-    if 'Access-Control-Allow-Headers' not in response.headers:
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    if 'Access-Control-Allow-Methods' not in response.headers:
-        response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
+    duration_ms = (time.perf_counter() - g._t0) * 1000 if hasattr(g, '_t0') else 0.0
+    logger.info("Outgoing response: %s %s %s duration_ms=%.1f", request.method, request.path, response.status, duration_ms)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Headers: %s", dict(response.headers))
     
     return response
 
-# Special handler for OPTIONS requests (preflight)
-@app.route('/api/analyze', methods=['OPTIONS'])
-def handle_options():
-    print("Handling OPTIONS preflight request for /api/analyze")
-    return Response()  # The after_request handler will add the CORS headers
+# Shared HTTP session so Claude API calls reuse pooled keep-alive connections
+CLAUDE_API_URL = "https://api.anthropic.com/v1/messages"
+CLAUDE_SESSION = requests.Session()
+CLAUDE_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+CLAUDE_MODEL = "claude-3-opus-20240229"
+
+def post_claude_image_request(api_key, prompt, jpeg_bytes):
+    """Send a prompt plus a JPEG to the Claude API, base64-encoding the image exactly once"""
+    base64_image = pybase64.b64encode_as_string(jpeg_bytes)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Base64 image length: %s characters", len(base64_image))
+    
+    headers = {
+        "x-api-key": api_key,
+        "content-type": "application/json",
+        "anthropic-version": "2023-06-01"
+    }
+    
+    data = {
+        "model": CLAUDE_MODEL,
+        "max_tokens": 1000,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt
+                    },
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": "image/jpeg",
+                            "data": base64_image
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+    
+    # Serialize with orjson; the body is dominated by the base64 string
+    return CLAUDE_SESSION.post(
+        CLAUDE_API_URL,
+        headers=headers,
+        data=orjson.dumps(data),
+        timeout=60
+    )
 
 # Ensure output directories exist
 Path(f"{parent_dir}/output/videos").mkdir(parents=True, exist_ok=True)
 Path(f"{parent_dir}/output/frames").mkdir(parents=True, exist_ok=True)
 Path(f"{parent_dir}/output/analysis").mkdir(parents=True, exist_ok=True)
 
-print(f"Output directories:")
-print(f"  Frames dir: {parent_dir}/output/frames - Exists: {os.path.exists(f'{parent_dir}/output/frames')}")
-print(f"  Analysis dir: {parent_dir}/output/analysis - Exists: {os.path.exists(f'{parent_dir}/output/analysis')}")
-print(f"  Videos dir: {parent_dir}/output/videos - Exists: {os.path.exists(f'{parent_dir}/output/videos')}")
+logger.info("Output directories:")
+logger.info("  Frames dir: %s/output/frames - Exists: %s", parent_dir, os.path.exists(f'{parent_dir}/output/frames'))
+logger.info("  Analysis dir: %s/output/analysis - Exists: %s", parent_dir, os.path.exists(f'{parent_dir}/output/analysis'))
+logger.info("  Videos dir: %s/output/videos - Exists: %s", parent_dir, os.path.exists(f'{parent_dir}/output/videos'))
 
 # Ensure directories exist with more verbose output
 for path in [f"{parent_dir}/output/videos", f"{parent_dir}/output/frames", f"{parent_dir}/output/analysis"]:
     try:
         Path(path).mkdir(parents=True, exist_ok=True)
-        print(f"Successfully ensured directory exists: {path}")
+        logger.info("Successfully ensured directory exists: %s", path)
+    except Exception as e:
+        logger.error("Error creating directory %s: %s", path, e)
+
+# Check once at startup that the output directory is writable
+def check_output_writable():
+    test_file = f"{parent_dir}/output/test_permissions.txt"
+    try:
+        with open(test_file, 'w') as f:
+            f.write("Test")
+        os.remove(test_file)
+        return True, None
     except Exception as e:
-        print(f"Error creating directory {path}: {str(e)}")
+        return False, str(e)
+
+_OUTPUT_WRITABLE, _OUTPUT_WRITE_ERROR = check_output_writable()
+if _OUTPUT_WRITABLE:
+    logger.info("Output directory has write permissions")
+else:
+    logger.error("ERROR: Output directory permission issue: %s", _OUTPUT_WRITE_ERROR)
 
 # Database setup
-DB_PATH = f"{parent_dir}/backend/analysis_history.db"
+# SQL used on the hot path; keeping the text identical lets each connection's statement cache reuse the prepared statement
+_SELECT_PROMPT_SQL = "SELECT prompt FROM custom_prompt WHERE id=1"
+_UPDATE_PROMPT_SQL = "UPDATE custom_prompt SET prompt=? WHERE id=1"
+_INSERT_DEFAULT_PROMPT_SQL = "INSERT OR IGNORE INTO custom_prompt (id, prompt) VALUES (1, ?)"
+_INSERT_ANALYSIS_SQL = "INSERT INTO analysis_history (timestamp, frame_path, prompt, result, device_id) VALUES (?, ?, ?, ?, ?)"
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS analysis_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        frame_path TEXT,
-        prompt TEXT,
-        result TEXT,
-        device_id TEXT
-    )
-    ''')
-    
-    # Create a table to store the custom prompt
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS custom_prompt (
-        id INTEGER PRIMARY KEY,
-        prompt TEXT
-    )
-    ''')
-    
-    # Insert default prompt if not exists
-    cursor.execute("SELECT COUNT(*) FROM custom_prompt")
-    if cursor.fetchone()[0] == 0:
+    with write_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            frame_path TEXT,
+            prompt TEXT,
+            result TEXT,
+            device_id TEXT
+        )
+        ''')
+        
+        # Indexes for /api/history: per-device lookups and the stream-only listing, both newest first
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_hist_device_ts ON analysis_history(device_id, timestamp DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_hist_stream_ts ON analysis_history(timestamp DESC) WHERE device_id LIKE 'stream_%'")
+        
+        # Create a table to store the custom prompt
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS custom_prompt (
+            id INTEGER PRIMARY KEY,
+            prompt TEXT
+        )
+        ''')
+        
+        # Insert default prompt if not exists
         default_prompt = '''Please analyze this image from a security camera. 
 Focus on:
 1. Are there any people or objects of interest visible?
@@ -139,41 +241,295 @@ Focus on:
 3. Is there any text visible in the image? If so, what does it say?
 
 Provide a detailed but concise analysis.'''
-        cursor.execute("INSERT INTO custom_prompt (id, prompt) VALUES (1, ?)", (default_prompt,))
-    
-    conn.commit()
-    conn.close()
+        cursor.execute(_INSERT_DEFAULT_PROMPT_SQL, (default_prompt,))
+        
+        # Gather planner statistics once so the history indexes are chosen; after that,
+        # PRAGMA optimize at connection close keeps them current (see db.close_all)
+        has_stats = cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'").fetchone()
+        if not has_stats or not cursor.execute("SELECT 1 FROM sqlite_stat1 WHERE tbl='analysis_history' LIMIT 1").fetchone():
+            cursor.execute("ANALYZE")
 
 # Initialize the database
 init_db()
+start_wal_checkpointer()
+
+# In-process cache of the default prompt as a (loaded_at, text, etag) tuple. An update refreshes
+# the cache of the worker that handled it at once; other gunicorn workers re-read the prompt once
+# their copy is older than PROMPT_CACHE_TTL seconds. The ETag hashes the text so it agrees across workers.
+PROMPT_CACHE_TTL = 5.0
+_PROMPT_CACHE = {'entry': None}
+_PROMPT_LOCK = threading.Lock()
+
+# Store a prompt in the cache; the caller must hold _PROMPT_LOCK
+def _cache_prompt(prompt):
+    entry = (time.monotonic(), prompt, hashlib.md5(prompt.encode('utf-8')).hexdigest())
+    _PROMPT_CACHE['entry'] = entry
+    return entry
+
+def _prompt_is_fresh(entry):
+    return entry is not None and time.monotonic() - entry[0] < PROMPT_CACHE_TTL
+
+# Get the default prompt and its ETag, re-reading the database only when the cached copy has expired
+def get_cached_prompt():
+    entry = _PROMPT_CACHE['entry']
+    if not _prompt_is_fresh(entry):
+        with _PROMPT_LOCK:
+            entry = _PROMPT_CACHE['entry']
+            if not _prompt_is_fresh(entry):
+                with read_connection() as conn:
+                    result = conn.execute(_SELECT_PROMPT_SQL).fetchone()
+                entry = _cache_prompt(result[0] if result else "Please analyze this image.")
+    return entry[1], entry[2]
 
 # Get the default prompt
 def get_default_prompt():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT prompt FROM custom_prompt WHERE id=1")
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else "Please analyze this image."
+    return get_cached_prompt()[0]
 
 # Update the custom prompt
 def update_custom_prompt(new_prompt):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE custom_prompt SET prompt=? WHERE id=1", (new_prompt,))
-    conn.commit()
-    conn.close()
+    with write_connection() as conn:
+        conn.execute(_UPDATE_PROMPT_SQL, (new_prompt,))
+    with _PROMPT_LOCK:
+        _cache_prompt(new_prompt)
+
+# Analysis rows are queued and inserted by a single background writer thread
+# Writes waiting for a background thread are capped so a slow disk cannot grow memory without
+# bound; once the cap is reached, request threads wait for room instead of queueing more.
+MAX_PENDING_WRITES = 1024
+
+_WRITE_Q = queue.Queue(maxsize=MAX_PENDING_WRITES)
+_WRITE_STOP = object()
+
+def _analysis_writer():
+    while True:
+        item = _WRITE_Q.get()
+        if item is _WRITE_STOP:
+            return
+        
+        # Drain whatever else is pending so the batch shares one transaction
+        batch = [item]
+        stop = False
+        while True:
+            try:
+                item = _WRITE_Q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _WRITE_STOP:
+                stop = True
+                break
+            batch.append(item)
+        
+        try:
+            with write_connection() as conn:
+                conn.executemany(_INSERT_ANALYSIS_SQL, batch)
+            logger.info("Saved %s analysis record(s) to database", len(batch))
+        except Exception as e:
+            logger.exception("ERROR saving analysis to database: %s", e)
+        
+        if stop:
+            return
+
+_writer_thread = threading.Thread(target=_analysis_writer, name="analysis-writer", daemon=True)
+_writer_thread.start()
+
+def stop_analysis_writer():
+    _WRITE_Q.put(_WRITE_STOP)
+    _writer_thread.join(timeout=5)
+
+atexit.register(stop_analysis_writer)
 
 # Save analysis to database
 def save_analysis(timestamp, frame_path, prompt, result, device_id="default"):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO analysis_history (timestamp, frame_path, prompt, result, device_id) VALUES (?, ?, ?, ?, ?)",
-        (timestamp, frame_path, prompt, result, device_id)
-    )
-    conn.commit()
-    conn.close()
+    item = (timestamp, frame_path, prompt, result, device_id)
+    try:
+        _WRITE_Q.put_nowait(item)
+    except queue.Full:
+        logger.warning("Analysis write queue is full; waiting for the database writer")
+        _WRITE_Q.put(item)
+
+# Video lookup: index every .mp4 in the search directories once at startup
+ALLOWED_VIDEOS = ["cat_food.mp4", "gauge.mp4", "pedestrians.mp4", "football.mp4", "thermometer.mp4", "times_square.mp4"]
+VIDEO_SEARCH_DIRS = [
+    parent_dir,
+    f"{parent_dir}/frontend/public",
+    f"{parent_dir}/frontend/src/assets"
+]
+
+def build_video_registry():
+    """Map each video filename to its path, earlier search directories taking precedence"""
+    registry = {}
+    for directory in VIDEO_SEARCH_DIRS:
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            if name.endswith('.mp4'):
+                registry.setdefault(name, os.path.join(directory, name))
+    return registry
+
+VIDEO_REGISTRY = build_video_registry()
+TEST_VIDEO_PATH = VIDEO_REGISTRY.get("test_video.mp4")
+
+# Video metadata cache: filename -> {path, fps, total_frames, duration, mtime}
+VIDEO_META = {}
+
+def open_video_capture(path):
+    """Open a video with the FFmpeg backend, falling back to OpenCV's default"""
+    cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(path)
+    return cap
+
+def probe_video(path):
+    """Read FPS and frame count from the container header"""
+    cap = open_video_capture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    return {
+        "path": path,
+        "fps": fps,
+        "total_frames": total_frames,
+        "duration": total_frames / fps if fps > 0 else 0,
+        "mtime": os.path.getmtime(path)
+    }
+
+def get_video_meta(filename):
+    """Return cached metadata for a video, re-probing only when the file has changed"""
+    meta = VIDEO_META.get(filename)
+    if meta:
+        try:
+            if os.path.getmtime(meta["path"]) == meta["mtime"]:
+                return meta
+        except OSError:
+            pass
+    
+    path = VIDEO_REGISTRY.get(filename)
+    meta = probe_video(path) if path else None
+    if meta:
+        VIDEO_META[filename] = meta
+    else:
+        VIDEO_META.pop(filename, None)
+    return meta
+
+for _filename in ALLOWED_VIDEOS:
+    get_video_meta(_filename)
+
+logger.info("Indexed %s videos at startup", len(VIDEO_REGISTRY))
+
+# Extracted frames are downscaled and re-encoded before being stored and sent to Claude
+FRAME_MAX_DIMENSION = 1280
+FRAME_JPEG_QUALITY = 80
+
+def encode_frame_jpeg(frame):
+    """Downscale a frame to FRAME_MAX_DIMENSION and encode it as an optimized JPEG"""
+    h, w = frame.shape[:2]
+    scale = min(1.0, FRAME_MAX_DIMENSION / max(h, w))
+    if scale < 1.0:
+        frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return cv2.imencode('.jpg', frame, [
+        int(cv2.IMWRITE_JPEG_QUALITY), FRAME_JPEG_QUALITY,
+        int(cv2.IMWRITE_JPEG_OPTIMIZE), 1
+    ])
+
+# Worker pool for disk side effects that can overlap with the Claude round trip
+EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="io")
+
+# The executor's own queue is unbounded, so pending tasks are counted against the same cap
+_PENDING_TASKS = threading.BoundedSemaphore(MAX_PENDING_WRITES)
+
+def _finish_background_task(future):
+    _PENDING_TASKS.release()
+    error = future.exception()
+    if error:
+        logger.error("ERROR in background task: %s", error)
+
+def run_in_background(fn, *args):
+    """Submit a side effect to the worker pool, logging any failure"""
+    if not _PENDING_TASKS.acquire(blocking=False):
+        logger.warning("Background task queue is full; waiting for a free slot")
+        _PENDING_TASKS.acquire()
+    try:
+        future = EXECUTOR.submit(fn, *args)
+    except Exception:
+        _PENDING_TASKS.release()
+        raise
+    future.add_done_callback(_finish_background_task)
+    return future
+
+def write_file_in_background(path, data):
+    """Persist bytes or text to disk without blocking the request thread"""
+    if isinstance(data, str):
+        return run_in_background(Path(path).write_text, data)
+    return run_in_background(Path(path).write_bytes, data)
+
+FRAMES_DIR = f"{parent_dir}/output/frames"
+
+def new_frame_filename(prefix, timestamp):
+    """Name a captured frame; the random suffix keeps captures in the same second apart"""
+    return f"{prefix}_{timestamp}_{uuid.uuid4().hex[:12]}.jpg"
+
+# Media offload to a fronting web server. With nginx, set ACCEL_REDIRECT_PREFIX to an
+# internal location aliased to the project directory; with Apache/lighttpd set USE_X_SENDFILE=1.
+# Either way the web server streams the file itself instead of copying it through Python.
+ACCEL_REDIRECT_PREFIX = os.getenv("ACCEL_REDIRECT_PREFIX")
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE") == "1"
+
+def accel_redirect_response(path, mimetype):
+    """Hand a file under parent_dir to nginx via X-Accel-Redirect"""
+    relative_path = os.path.relpath(path, parent_dir).replace(os.sep, '/')
+    response = Response(mimetype=mimetype)
+    response.headers['X-Accel-Redirect'] = f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(relative_path)}"
+    return response
+
+# Frame filenames are unique per capture (see new_frame_filename), so browsers may cache them indefinitely
+FRAME_CACHE_MAX_AGE = 31536000
+
+# Video list served by /api/videos; it never changes, so it is serialized once
+VIDEO_LIST = [
+    {
+        "id": "football",
+        "name": "Backyard Cam",
+        "filename": "football.mp4",
+        "description": "Football game in backyard"
+    },
+    {
+        "id": "cat_food",
+        "name": "Cat Cam",  # Changed from Kitchen Cam
+        "filename": "cat_food.mp4", 
+        "description": "Cat food monitoring"
+    },
+    {
+        "id": "gauge",
+        "name": "Gauge Cam",  # Changed from Utility Cam
+        "filename": "gauge.mp4",
+        "description": "Gauge monitoring"
+    },
+    {
+        "id": "pedestrians",
+        "name": "Street Cam",  # Changed from Front Door Cam
+        "filename": "pedestrians.mp4", 
+        "description": "Pedestrians on sidewalk"
+    },
+    {
+        "id": "thermometer",
+        "name": "Thermometer Cam",  # Changed from Weather Cam
+        "filename": "thermometer.mp4",
+        "description": "Temperature monitoring"
+    },
+    {
+        "id": "times_square",
+        "name": "Times Square Cam",
+        "filename": "times_square.mp4",
+        "description": "Times Square street view"
+    }
+]
+_VIDEOS_JSON = orjson.dumps(VIDEO_LIST)
 
 # Routes
 @app.route('/api/hello')
@@ -185,29 +541,19 @@ def serve_video_by_filename(filename):
     """Serve a specified video file"""
     try:
         # Security: Only allow specific video files
-        allowed_videos = ["cat_food.mp4", "gauge.mp4", "pedestrians.mp4", "football.mp4", "thermometer.mp4", "times_square.mp4"]
-        if filename not in allowed_videos:
-            print(f"ERROR: Requested video {filename} is not in allowed list")
+        if filename not in ALLOWED_VIDEOS:
+            logger.error("ERROR: Requested video %s is not in allowed list", filename)
             return jsonify({"error": "Video not found"}), 404
-                    
-        # Try multiple locations for the video
-        possible_paths = [
-            f"{parent_dir}/{filename}",
-            f"{parent_dir}/frontend/public/{filename}",
-            f"{parent_dir}/frontend/src/assets/{filename}"
-        ]
         
-        video_path = None
-        for path in possible_paths:
-            if os.path.exists(path):
-                video_path = path
-                break
-                
+        video_path = VIDEO_REGISTRY.get(filename)
         if not video_path:
-            print(f"ERROR: Video file not found in any of the expected locations")
+            logger.error("ERROR: Video file not found in any of the expected locations")
             return jsonify({"error": "Video file not found"}), 404
             
-        print(f"Video file found, serving from: {video_path}")
+        logger.info("Video file found, serving from: %s", video_path)
+        
+        if ACCEL_REDIRECT_PREFIX:
+            return accel_redirect_response(video_path, 'video/mp4')
         
         # Create response
         try:
@@ -216,280 +562,177 @@ def serve_video_by_filename(filename):
                 video_path, 
                 mimetype='video/mp4',
                 as_attachment=False,
-                conditional=True  # Support partial requests
+                conditional=True,  # Support partial requests
+                etag=True,
+                last_modified=os.path.getmtime(video_path)
             )
             response.headers['Accept-Ranges'] = 'bytes'
-            print("Video response prepared successfully")
+            logger.info("Video response prepared successfully")
             return response
         except Exception as e:
-            print(f"ERROR creating response: {str(e)}")
+            logger.error("ERROR creating response: %s", e)
             return jsonify({"error": f"Failed to create response: {str(e)}"}), 500
     except Exception as e:
-        print(f"ERROR serving video: {str(e)}")
+        logger.error("ERROR serving video: %s", e)
         return jsonify({"error": str(e)}), 500
     
 @app.route('/api/videos')
 def list_videos():
     """List available videos"""
-    videos = [
-        {
-            "id": "football",
-            "name": "Backyard Cam",
-            "filename": "football.mp4",
-            "description": "Football game in backyard"
-        },
-        {
-            "id": "cat_food",
-            "name": "Cat Cam",  # Changed from Kitchen Cam
-            "filename": "cat_food.mp4", 
-            "description": "Cat food monitoring"
-        },
-        {
-            "id": "gauge",
-            "name": "Gauge Cam",  # Changed from Utility Cam
-            "filename": "gauge.mp4",
-            "description": "Gauge monitoring"
-        },
-        {
-            "id": "pedestrians",
-            "name": "Street Cam",  # Changed from Front Door Cam
-            "filename": "pedestrians.mp4", 
-            "description": "Pedestrians on sidewalk"
-        },
-        {
-            "id": "thermometer",
-            "name": "Thermometer Cam",  # Changed from Weather Cam
-            "filename": "thermometer.mp4",
-            "description": "Temperature monitoring"
-        },
-        {
-            "id": "times_square",
-            "name": "Times Square Cam",
-            "filename": "times_square.mp4",
-            "description": "Times Square street view"
-        }
-    ]
-    return jsonify(videos)
+    response = Response(_VIDEOS_JSON, mimetype='application/json')
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
     """Analyze a frame from the video at a specific time"""
     try:
-        print("\n\n==== NEW ANALYSIS REQUEST ====")
+        logger.info("New analysis request")
         data = request.json
         time_seconds = data.get('timeSeconds', 5.0)
         device_id = data.get('deviceId', 'default')
         video_filename = data.get('videoFilename', 'football.mp4')  # Get video filename from request
         custom_prompt = data.get('prompt')
         
-        print(f"Debug: Received analysis request for time {time_seconds}s with device_id {device_id}")
-        print(f"Debug: Using video file: {video_filename}")
-        print(f"Request data: {data}")
+        logger.debug("Debug: Received analysis request for time %ss with device_id %s", time_seconds, device_id)
+        logger.debug("Debug: Using video file: %s", video_filename)
+        logger.debug("Request data: %s", data)
         
         if not custom_prompt:
             custom_prompt = get_default_prompt()
-            print(f"Debug: Using default prompt: {custom_prompt[:50]}...")
+            logger.debug("Debug: Using default prompt: %s...", custom_prompt[:50])
         else:
-            print(f"Debug: Using custom prompt: {custom_prompt[:50]}...")
+            logger.debug("Debug: Using custom prompt: %s...", custom_prompt[:50])
         
         # Check for required modules
         try:
             import cv2
-            print("Debug: OpenCV imported successfully")
+            logger.debug("Debug: OpenCV imported successfully")
         except ImportError:
-            print("ERROR: OpenCV (cv2) is not installed")
+            logger.error("ERROR: OpenCV (cv2) is not installed")
             return jsonify({"error": "OpenCV is not installed on the server"}), 500
         
-        # Look for the video in multiple locations
-        possible_video_paths = [
-            f"{parent_dir}/{video_filename}",
-            f"{parent_dir}/frontend/public/{video_filename}",
-            f"{parent_dir}/frontend/src/assets/{video_filename}"
-        ]
-        
-        # Find the first path that exists
-        video_path = None
-        for path in possible_video_paths:
-            if os.path.exists(path):
-                video_path = path
-                print(f"Debug: Video found at {video_path}")
-                break
-        
-        if not video_path:
-            print(f"Error: Video file '{video_filename}' not found in any expected location")
+        # Look up the video path and properties from the startup cache
+        video_meta = get_video_meta(video_filename)
+        if not video_meta:
+            logger.error("Error: Video file '%s' not found in any expected location", video_filename)
             return jsonify({"error": f"Video file '{video_filename}' not found"}), 404
             
-        print(f"Debug: Using video at {video_path}")
-        print(f"File size: {os.path.getsize(video_path)} bytes")
+        video_path = video_meta["path"]
+        logger.debug("Debug: Using video at %s", video_path)
         
         # Extract a frame
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        frame_path = f"{parent_dir}/output/frames/frame_{timestamp}.jpg"
+        frame_path = f"{FRAMES_DIR}/{new_frame_filename('frame', timestamp)}"
         
         # Ensure the output directory exists
         os.makedirs(os.path.dirname(frame_path), exist_ok=True)
         
-        # Test output directory permissions
-        try:
-            test_file = f"{parent_dir}/output/test_permissions.txt"
-            with open(test_file, 'w') as f:
-                f.write("Test")
-            os.remove(test_file)
-            print("Debug: Output directory has write permissions")
-        except Exception as e:
-            print(f"ERROR: Output directory permission issue: {str(e)}")
-            return jsonify({"error": f"Server cannot write to output directory: {str(e)}"}), 500
+        # Output directory permissions are checked once at startup
+        if not _OUTPUT_WRITABLE:
+            logger.error("ERROR: Output directory permission issue: %s", _OUTPUT_WRITE_ERROR)
+            return jsonify({"error": f"Server cannot write to output directory: {_OUTPUT_WRITE_ERROR}"}), 500
         
         # Log the extraction attempt
-        print(f"Debug: Extracting frame at {time_seconds}s from {video_path} to {frame_path}")
+        logger.debug("Debug: Extracting frame at %ss from %s to %s", time_seconds, video_path, frame_path)
         
         # Try extracting the frame with extensive logging
         try:
-            print("Opening video file...")
-            cap = cv2.VideoCapture(video_path)
+            logger.info("Opening video file...")
+            cap = open_video_capture(video_path)
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
             if not cap.isOpened():
-                print(f"ERROR: Could not open video file at {video_path}")
+                logger.error("ERROR: Could not open video file at %s", video_path)
                 return jsonify({"error": "Could not open video file"}), 500
             
             # Get video properties
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps if fps > 0 else 0
+            fps = video_meta["fps"]
+            total_frames = video_meta["total_frames"]
+            duration = video_meta["duration"]
             
-            print(f"Video properties: {fps} FPS, {total_frames} frames, {duration:.2f} seconds")
+            logger.info("Video properties: %s FPS, %s frames, %.2f seconds", fps, total_frames, duration)
             
             # Ensure time_seconds is within the video duration
             if time_seconds > duration:
                 time_seconds = duration / 2  # Take middle frame if specified time exceeds duration
-                print(f"Requested time exceeds video duration. Using {time_seconds:.2f} seconds instead.")
+                logger.info("Requested time exceeds video duration. Using %.2f seconds instead.", time_seconds)
             
-            # Set frame position
-            frame_pos = int(time_seconds * fps)
-            success = cap.set(cv2.CAP_PROP_POS_FRAMES, frame_pos)
-            print(f"Seeking to frame position {frame_pos}: {'Success' if success else 'Failed'}")
+            # Seek by timestamp so the demuxer can jump directly within the container
+            success = cap.set(cv2.CAP_PROP_POS_MSEC, time_seconds * 1000.0)
+            logger.info("Seeking to %.2f seconds: %s", time_seconds, 'Success' if success else 'Failed')
             
             # Read the frame
-            print("Reading frame...")
+            logger.info("Reading frame...")
             ret, frame = cap.read()
             if not ret:
-                print("ERROR: Failed to read frame")
+                logger.error("ERROR: Failed to read frame")
                 cap.release()
                 return jsonify({"error": "Failed to read frame from video"}), 500
             
-            # Save the frame
-            print(f"Saving frame to {frame_path}...")
-            success = cv2.imwrite(frame_path, frame)
-            if not success:
-                print(f"ERROR: Failed to save frame to {frame_path}")
-                cap.release()
-                return jsonify({"error": "Failed to save frame"}), 500
-            
             cap.release()
             
-            # Verify frame was saved
-            if not os.path.exists(frame_path):
-                print(f"ERROR: Frame was not saved to {frame_path}")
-                return jsonify({"error": "Frame was not saved properly"}), 500
+            # Encode the frame in memory; the copy on disk is written in the background
+            success, jpeg_buffer = encode_frame_jpeg(frame)
+            if not success:
+                logger.error("ERROR: Failed to encode frame")
+                return jsonify({"error": "Failed to encode frame"}), 500
+            jpeg_bytes = jpeg_buffer.tobytes()
+            
+            logger.info("Saving frame to %s...", frame_path)
+            write_file_in_background(frame_path, jpeg_bytes)
             
-            print(f"Debug: Frame extracted successfully to {frame_path}, size: {os.path.getsize(frame_path)} bytes")
+            logger.debug("Debug: Frame extracted successfully, size: %s bytes", len(jpeg_bytes))
             
             # Check if Anthropic API key exists
             api_key = os.getenv("ANTHROPIC_API_KEY")
             if not api_key:
-                print(f"ERROR: ANTHROPIC_API_KEY environment variable not set")
+                logger.error("ERROR: ANTHROPIC_API_KEY environment variable not set")
                 return jsonify({"error": "Claude API key not configured"}), 500
             else:
-                print(f"Debug: Found Claude API key (first few chars): {api_key[:5]}...")
+                logger.debug("Debug: Found Claude API key (first few chars): %s...", api_key[:5])
             
             # Analyze with Claude
-            print(f"Debug: Sending frame to Claude for analysis")
+            logger.debug("Debug: Sending frame to Claude for analysis")
             
             try:
-                # Encode the image to base64
-                print("Encoding image to base64...")
-                with open(frame_path, "rb") as image_file:
-                    base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-                print(f"Base64 image length: {len(base64_image)} characters")
+                logger.info("Sending request to Claude API...")
+                response = post_claude_image_request(api_key, custom_prompt, jpeg_bytes)
                 
-                # Prepare the API request
-                print("Preparing Claude API request...")
-                headers = {
-                    "x-api-key": api_key,
-                    "content-type": "application/json",
-                    "anthropic-version": "2023-06-01"
-                }
-                
-                data = {
-                    "model": "claude-3-opus-20240229",
-                    "max_tokens": 1000,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": custom_prompt
-                                },
-                                {
-                                    "type": "image",
-                                    "source": {
-                                        "type": "base64",
-                                        "media_type": "image/jpeg",
-                                        "data": base64_image
-                                    }
-                                }
-                            ]
-                        }
-                    ]
-                }
-                
-                print("Sending request to Claude API...")
-                response = requests.post(
-                    "https://api.anthropic.com/v1/messages",
-                    headers=headers,
-                    json=data,
-                    timeout=60  # Increase timeout
-                )
-                
-                print(f"Claude API response status code: {response.status_code}")
+                logger.info("Claude API response status code: %s", response.status_code)
                 
                 if response.status_code == 200:
                     result = response.json()
                     analysis = result["content"][0]["text"]
-                    print("Analysis complete! First 100 chars:")
-                    print(analysis[:100] + "...")
+                    logger.info("Analysis complete! First 100 chars:")
+                    logger.info("%s...", analysis[:100])
                 else:
                     error_text = response.text[:500] if response.text else "No error details"
-                    print(f"ERROR from Claude API: {response.status_code}")
-                    print(f"Error details: {error_text}")
+                    logger.error("ERROR from Claude API: %s", response.status_code)
+                    logger.error("Error details: %s", error_text)
                     return jsonify({"error": f"Claude API returned error: {response.status_code}"}), 500
             except Exception as e:
-                print(f"ERROR during Claude API request: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("ERROR during Claude API request: %s", e)
                 return jsonify({"error": f"Error calling Claude API: {str(e)}"}), 500
             
             # Save analysis to file
-            print("Saving analysis to file...")
+            logger.info("Saving analysis to file...")
             analysis_path = f"{parent_dir}/output/analysis/analysis_{timestamp}.txt"
-            with open(analysis_path, "w") as f:
-                f.write(analysis)
+            write_file_in_background(analysis_path, analysis)
             
             # Save to database
             try:
-                print("Saving to database...")
                 frame_filename = os.path.basename(frame_path)
-                print(f"Debug: Saving analysis to database with frame path: {frame_filename}")
+                logger.debug("Debug: Queueing analysis for database with frame path: %s", frame_filename)
                 save_analysis(timestamp, frame_filename, custom_prompt, analysis, device_id)
-                print("Successfully saved to database")
+                # The writer thread logs the insert once it commits
+                logger.info("Queued analysis for database")
             except Exception as e:
-                print(f"ERROR saving to database: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("ERROR queueing analysis for database: %s", e)
                 # Continue even if database save fails
             
-            print(f"Debug: Analysis complete and saved successfully")
+            logger.debug("Debug: Analysis complete and saved successfully")
             
             # Return result with full data
             return jsonify({
@@ -500,15 +743,11 @@ def analyze():
             })
             
         except Exception as e:
-            print(f"ERROR during frame extraction or analysis: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("ERROR during frame extraction or analysis: %s", e)
             return jsonify({"error": str(e)}), 500
             
     except Exception as e:
-        print(f"UNEXPECTED ERROR in analyze endpoint: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("UNEXPECTED ERROR in analyze endpoint: %s", e)
         return jsonify({"error": str(e)}), 500
             
 # Fix 1: Modify the analyze-stream endpoint to avoid printing base64 data
@@ -516,11 +755,11 @@ def analyze():
 def analyze_stream():
     """Analyze a snapshot from a live stream"""
     try:
-        print("\n\n==== NEW STREAM SNAPSHOT ANALYSIS REQUEST ====")
+        logger.info("New stream snapshot analysis request")
         
         # Check if the image file was provided
         if 'image' not in request.files:
-            print("No image file provided")
+            logger.info("No image file provided")
             return jsonify({"error": "No image file provided"}), 400
             
         # Get image file
@@ -529,125 +768,80 @@ def analyze_stream():
         device_id = request.form.get('deviceId', 'default')
         stream_name = request.form.get('streamName', 'Unknown Stream')
         
-        print(f"Debug: Received stream snapshot from {stream_name} with device_id {device_id}")
+        logger.debug("Debug: Received stream snapshot from %s with device_id %s", stream_name, device_id)
         
         # Save the image to a temporary file
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        frame_path = f"{parent_dir}/output/frames/stream_{timestamp}.jpg"
+        frame_path = f"{FRAMES_DIR}/{new_frame_filename('stream', timestamp)}"
         
         # Ensure the output directory exists
         os.makedirs(os.path.dirname(frame_path), exist_ok=True)
         
+        # Keep the snapshot in memory; the copy on disk is written in the background
         try:
-            image_file.save(frame_path)
-            print(f"Debug: Stream snapshot saved to {frame_path}")
+            # Werkzeug may have spooled a large upload to a temporary file; read it from the start
+            image_file.stream.seek(0)
+            image_bytes = image_file.stream.read()
         except Exception as e:
-            print(f"ERROR: Failed to save stream snapshot: {str(e)}")
-            return jsonify({"error": f"Failed to save stream snapshot: {str(e)}"}), 500
+            logger.error("ERROR: Failed to read stream snapshot: %s", e)
+            return jsonify({"error": f"Failed to read stream snapshot: {str(e)}"}), 500
         
-        # Check if the file was saved successfully
-        if not os.path.exists(frame_path):
-            print(f"ERROR: Stream snapshot was not saved to {frame_path}")
-            return jsonify({"error": "Stream snapshot was not saved properly"}), 500
+        if not image_bytes:
+            logger.error("ERROR: Stream snapshot is empty")
+            return jsonify({"error": "Stream snapshot is empty"}), 400
             
-        print(f"Debug: Stream snapshot saved successfully, size: {os.path.getsize(frame_path)} bytes")
+        write_file_in_background(frame_path, image_bytes)
+        logger.debug("Debug: Stream snapshot received, size: %s bytes", len(image_bytes))
         
         # Check for API key
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
-            print("ERROR: ANTHROPIC_API_KEY environment variable not set")
+            logger.error("ERROR: ANTHROPIC_API_KEY environment variable not set")
             return jsonify({"error": "Claude API key not configured"}), 500
             
         # Analyze with Claude
-        print("Debug: Sending stream snapshot to Claude for analysis")
+        logger.debug("Debug: Sending stream snapshot to Claude for analysis")
         
         try:
-            # Encode the image to base64
-            print("Encoding image to base64...")
-            with open(frame_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-            
-            # Don't print the base64 data, just its length
-            print(f"Base64 image encoded successfully, length: {len(base64_image)} bytes")
-            
-            # Prepare Claude API request
-            print("Preparing Claude API request...")
-            headers = {
-                "x-api-key": api_key,
-                "content-type": "application/json",
-                "anthropic-version": "2023-06-01"
-            }
-            
-            data = {
-                "model": "claude-3-opus-20240229",
-                "max_tokens": 1000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": f"{prompt}\n\nThis is a snapshot from the live stream: {stream_name}."
-                            },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": base64_image
-                                }
-                            }
-                        ]
-                    }
-                ]
-            }
-            
-            print("Sending request to Claude API...")
-            response = requests.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=data,
-                timeout=60
+            logger.info("Sending request to Claude API...")
+            response = post_claude_image_request(
+                api_key,
+                f"{prompt}\n\nThis is a snapshot from the live stream: {stream_name}.",
+                image_bytes
             )
             
             if response.status_code == 200:
                 result = response.json()
                 analysis = result["content"][0]["text"]
                 # Fix 2: Don't print the raw content, just a short preview
-                print(f"Analysis complete! Preview: {analysis[:50]}...")
+                logger.info("Analysis complete! Preview: %s...", analysis[:50])
             else:
                 error_text = response.text[:500] if response.text else "No error details"
-                print(f"ERROR from Claude API: {response.status_code}")
-                print(f"Error details: {error_text}")
+                logger.error("ERROR from Claude API: %s", response.status_code)
+                logger.error("Error details: %s", error_text)
                 return jsonify({"error": f"Claude API returned error: {response.status_code}"}), 500
                 
         except Exception as e:
-            print(f"ERROR during Claude API request: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("ERROR during Claude API request: %s", e)
             return jsonify({"error": f"Error calling Claude API: {str(e)}"}), 500
             
         # Save analysis to file
         analysis_path = f"{parent_dir}/output/analysis/stream_analysis_{timestamp}.txt"
-        with open(analysis_path, "w") as f:
-            f.write(analysis)
-        print(f"Analysis saved to file: {analysis_path}")
+        write_file_in_background(analysis_path, analysis)
+        logger.info("Saving analysis to file: %s", analysis_path)
         
         # Fix 3: Create consistent frame filename for database storage
-        frame_filename = f"stream_{timestamp}.jpg"
+        frame_filename = os.path.basename(frame_path)
         
         # Fix 4: Save stream analysis to database with correct device_id format
         try:
             # Ensure we use a consistent device_id format that can be queried later
             stream_device_id = f"stream_{device_id}"
             
-            print(f"Saving to database with device_id: {stream_device_id}, frame: {frame_filename}")
             save_analysis(timestamp, frame_filename, prompt, analysis, stream_device_id)
-            print(f"Successfully saved stream analysis to database with ID: {stream_device_id}")
+            logger.info("Queued stream analysis for database with device_id: %s, frame: %s", stream_device_id, frame_filename)
         except Exception as e:
-            print(f"ERROR saving stream analysis to database: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("ERROR queueing stream analysis for database: %s", e)
             # Continue even if database save fails
             
         # Return result with the correct frame path
@@ -659,62 +853,65 @@ def analyze_stream():
         })
         
     except Exception as e:
-        print(f"UNEXPECTED ERROR in analyze-stream endpoint: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("UNEXPECTED ERROR in analyze-stream endpoint: %s", e)
         return jsonify({"error": str(e)}), 500
                 
 @app.route('/api/frames/<filename>')
 def serve_frame(filename):
     """Serve a stored frame"""
     try:
-        frame_path = f"{parent_dir}/output/frames/{filename}"
+        # Only serve plain filenames from the frames directory
+        safe_filename = secure_filename(filename)
+        if not safe_filename or safe_filename != filename:
+            logger.error("ERROR: Rejected frame filename %s", filename)
+            return jsonify({"error": "Frame not found"}), 404
         
-        # Check if file exists
-        if not os.path.exists(frame_path):
-            print(f"Frame not found at {frame_path}, checking alternate paths...")
-            
-            # Try other possible locations
-            alternate_paths = [
-                f"{parent_dir}/output/frames/stream_{filename}",  # In case "stream_" prefix is missing
-                f"{filename}"  # In case the full path was provided
-            ]
-            
-            for alt_path in alternate_paths:
-                if os.path.exists(alt_path):
-                    frame_path = alt_path
-                    print(f"Found frame at alternate path: {frame_path}")
-                    break
-            
-            if not os.path.exists(frame_path):
-                print(f"ERROR: Frame {filename} not found in any location")
-                return jsonify({"error": "Frame not found"}), 404
+        frame_path = os.path.join(FRAMES_DIR, safe_filename)
+        try:
+            last_modified = os.path.getmtime(frame_path)
+        except OSError:
+            logger.error("ERROR: Frame %s not found", filename)
+            return jsonify({"error": "Frame not found"}), 404
         
-        print(f"Serving frame: {frame_path}")
-        return send_file(frame_path, mimetype='image/jpeg')
+        logger.info("Serving frame: %s", frame_path)
+        if ACCEL_REDIRECT_PREFIX:
+            # nginx sends the file and handles validators; it keeps the Cache-Control set here
+            response = accel_redirect_response(frame_path, 'image/jpeg')
+            response.cache_control.public = True
+            response.cache_control.max_age = FRAME_CACHE_MAX_AGE
+            response.cache_control.immutable = True
+            return response
+        
+        response = send_file(
+            frame_path,
+            mimetype='image/jpeg',
+            conditional=True,
+            etag=True,
+            last_modified=last_modified,
+            max_age=FRAME_CACHE_MAX_AGE
+        )
+        response.cache_control.immutable = True
+        response.headers['Accept-Ranges'] = 'bytes'
+        return response
     except Exception as e:
-        print(f"Error serving frame {filename}: {str(e)}")
+        logger.error("Error serving frame %s: %s", filename, e)
         return jsonify({"error": str(e)}), 500
     
 @app.route('/api/video')
 def serve_video():
     """Serve the test video for frontend"""
     try:
-        video_path = f"{parent_dir}/test_video.mp4"
-        print(f"Video path: {video_path}")
-        
-        # Check if file exists
-        if not os.path.exists(video_path):
-            print(f"ERROR: Video file not found at {video_path}")
-            # Try the fallback location
-            video_path = f"{parent_dir}/frontend/public/test_video.mp4"
-            print(f"Trying fallback path: {video_path}")
-            
-            if not os.path.exists(video_path):
-                print(f"ERROR: Video not found at fallback path either")
-                return jsonify({"error": "Video file not found"}), 404
+        video_path = TEST_VIDEO_PATH
+        logger.info("Video path: %s", video_path)
+        
+        if not video_path:
+            logger.error("ERROR: Video file not found in any of the expected locations")
+            return jsonify({"error": "Video file not found"}), 404
             
-        print(f"Video file found, attempting to serve: {video_path}")
+        logger.info("Video file found, attempting to serve: %s", video_path)
+        
+        if ACCEL_REDIRECT_PREFIX:
+            return accel_redirect_response(video_path, 'video/mp4')
         
         # Create a test response 
         try:
@@ -727,52 +924,114 @@ def serve_video():
             )
             response.headers['Accept-Ranges'] = 'bytes'
             response.headers['Access-Control-Allow-Origin'] = '*'
-            print("Video response prepared successfully")
+            logger.info("Video response prepared successfully")
             return response
         except Exception as e:
-            print(f"ERROR creating response: {str(e)}")
+            logger.error("ERROR creating response: %s", e)
             return jsonify({"error": f"Failed to create response: {str(e)}"}), 500
     except Exception as e:
-        print(f"ERROR serving video: {str(e)}")
+        logger.error("ERROR serving video: %s", e)
         return jsonify({"error": str(e)}), 500
         
+# History is paged newest-first with a keyset cursor of "<timestamp>:<id>" taken from the last row of a page
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+_HISTORY_COLUMNS = ('id', 'timestamp', 'frame_path', 'prompt', 'result', 'device_id')
+_HISTORY_SELECT_SQL = f"SELECT {', '.join(_HISTORY_COLUMNS)} FROM analysis_history"
+
+# Row filter for each kind of history request; device pages also match the device's stream rows
+_HISTORY_FILTERS = {
+    'stream': "device_id LIKE 'stream_%'",
+    'default': "device_id='default'",
+    'device': "(device_id=? OR device_id=?)",
+}
+
+def _build_history_sql(where, with_cursor):
+    sql = f"{_HISTORY_SELECT_SQL} WHERE {where}"
+    if with_cursor:
+        sql += " AND (timestamp, id) < (?, ?)"
+    sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    return sql
+
+# Every history query text is built once, so requests always hit the connection's statement cache
+_HISTORY_SQL = {
+    (kind, with_cursor): _build_history_sql(where, with_cursor)
+    for kind, where in _HISTORY_FILTERS.items()
+    for with_cursor in (False, True)
+}
+
+# Validators for a history ETag: the filter's newest timestamp and the table's newest id. Rows are
+# only ever inserted, so every insert changes max(id); each max() is a single index seek.
+# The stream filter is pinned to its partial index, which the planner may otherwise skip on small tables.
+_HISTORY_STATS_TABLES = {'stream': "analysis_history INDEXED BY idx_hist_stream_ts"}
+_HISTORY_STATS_SQL = {
+    kind: (f"SELECT (SELECT max(timestamp) FROM {_HISTORY_STATS_TABLES.get(kind, 'analysis_history')} WHERE {where}),"
+           " (SELECT max(id) FROM analysis_history)")
+    for kind, where in _HISTORY_FILTERS.items()
+}
+
 @app.route('/api/history')
 def get_history():
-    """Get analysis history"""
+    """Get a page of analysis history"""
     device_id = request.args.get('deviceId', 'default')
     
     # Check if we're looking for stream analysis - support both formats
     is_stream = request.args.get('isStream', 'false').lower() == 'true'
     
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    try:
+        limit = max(1, min(int(request.args.get('limit', HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    
+    cursor_value = request.args.get('cursor')
+    if cursor_value:
+        cursor_ts, _, cursor_id = cursor_value.rpartition(':')
+        if not cursor_ts or not cursor_id.isdigit():
+            return jsonify({"error": "Invalid cursor"}), 400
     
     if is_stream:
         # Get stream analysis specifically
-        cursor.execute(
-            "SELECT * FROM analysis_history WHERE device_id LIKE 'stream_%' ORDER BY timestamp DESC"
-        )
-        print("Fetching stream analysis history")
+        kind = 'stream'
+        params = []
+        logger.info("Fetching stream analysis history")
+    elif device_id == 'default':
+        # Get standard analysis
+        kind = 'default'
+        params = []
+        logger.info("Fetching analysis history for device: %s", device_id)
     else:
-        # Get standard analysis or for specific device
-        if device_id == 'default':
-            cursor.execute(
-                "SELECT * FROM analysis_history WHERE device_id='default' ORDER BY timestamp DESC"
-            )
-        else:
-            # Support both formats for backward compatibility
-            cursor.execute(
-                "SELECT * FROM analysis_history WHERE device_id=? OR device_id=? ORDER BY timestamp DESC",
-                (device_id, f"stream_{device_id}")
-            )
-        print(f"Fetching analysis history for device: {device_id}")
+        # Support both formats for backward compatibility
+        kind = 'device'
+        params = [device_id, f"stream_{device_id}"]
+        logger.info("Fetching analysis history for device: %s", device_id)
     
-    history = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    # Pollers resend the ETag of their last page; skip the page query when nothing has changed
+    with read_connection() as conn:
+        newest, last_id = conn.execute(_HISTORY_STATS_SQL[kind], params).fetchone()
+        etag = hashlib.md5(f"{kind}|{params}|{cursor_value}|{limit}|{newest}|{last_id}".encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        
+        if cursor_value:
+            params += [cursor_ts, int(cursor_id)]
+        params.append(limit)
+        
+        sql = _HISTORY_SQL[kind, bool(cursor_value)]
+        rows = conn.execute(sql, params).fetchall()
     
-    print(f"Found {len(history)} analysis history entries")
-    return jsonify(history)
+    # A full page may have more rows after it; the cursor points at its last row
+    next_cursor = f"{rows[-1][1]}:{rows[-1][0]}" if len(rows) == limit else None
+    
+    logger.info("Found %s analysis history entries", len(rows))
+    items = [dict(zip(_HISTORY_COLUMNS, row)) for row in rows]
+    body = orjson.dumps({"items": items, "next_cursor": next_cursor})
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Let browsers keep the page but revalidate it on every request
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/api/test', methods=['GET', 'OPTIONS'])
 def test_endpoint():
@@ -785,13 +1044,17 @@ def test_endpoint():
         response.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
         return response
     
-    print("Test endpoint called")
+    logger.info("Test endpoint called")
     return jsonify({"message": "Backend connection successful", "time": str(datetime.datetime.now())})
 
 @app.route('/api/prompt', methods=['GET'])
 def get_prompt():
     """Get the current custom prompt"""
-    return jsonify({"prompt": get_default_prompt()})
+    prompt, etag = get_cached_prompt()
+    response = jsonify({"prompt": prompt})
+    response.set_etag(etag)
+    # Answers If-None-Match with an empty 304
+    return response.make_conditional(request)
 
 @app.route('/api/prompt', methods=['POST'])
 def update_prompt():
@@ -805,14 +1068,14 @@ def update_prompt():
     return jsonify({"success": True, "prompt": new_prompt})
 
 if __name__ == '__main__':
-    print("\n========================================")
-    print("Starting Flask server on http://localhost:5001")
-    print("Available endpoints:")
-    print("  - GET /api/test - Test endpoint")
-    print("  - POST /api/analyze - Analysis endpoint")
-    print("  - GET /api/history - Get analysis history")
-    print("  - GET/POST /api/prompt - Get/set analysis prompt")
-    print("  - GET /api/frames/<filename> - Serve frame images")
-    print("  - GET /api/video - Serve video file")
-    print("========================================\n")
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    logger.info("Starting Flask server on http://localhost:5001")
+    logger.info("Available endpoints:")
+    logger.info("  - GET /api/test - Test endpoint")
+    logger.info("  - POST /api/analyze - Analysis endpoint")
+    logger.info("  - GET /api/history - Get analysis history")
+    logger.info("  - GET/POST /api/prompt - Get/set analysis prompt")
+    logger.info("  - GET /api/frames/<filename> - Serve frame images")
+    logger.info("  - GET /api/video - Serve video file")
+    # The debugger and reloader are opt-in; production runs under gunicorn (see gunicorn.conf.py)
+    debug = os.getenv("FLASK_DEBUG", "0").lower() in ("1", "true")
+    app.run(debug=debug, port=5001, threaded=True)
\ No newline at end of file
@@ -0,0 +1,137 @@
+import os
+import queue
+import sqlite3
+import threading
+import atexit
+import logging
+from contextlib import contextmanager
+
+# SQLite database file used for analysis history and the custom prompt
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_history.db")
+
+logger = logging.getLogger('wyze')
+
+# Pragmas applied to every connection when it is opened
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+]
+
+# Prepared statements kept per connection; the app's fixed query set fits with room to spare
+STATEMENT_CACHE_SIZE = 128
+
+# Most reader connections kept open; request threads borrow one and wait when all are in use
+DB_POOL_SIZE = 8
+
+# Every connection this module opened (the pool, the writer and the checkpointer), closed at exit
+_connections = []
+_connections_lock = threading.Lock()
+
+# Function to open a long-lived, tuned SQLite connection
+def open_connection():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
+
+# Reader connections are opened on demand up to DB_POOL_SIZE and then reused
+_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+_pool_opened = 0
+_pool_lock = threading.Lock()
+
+@contextmanager
+def read_connection():
+    global _pool_opened
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        with _pool_lock:
+            can_open = _pool_opened < DB_POOL_SIZE
+            if can_open:
+                _pool_opened += 1
+        if can_open:
+            try:
+                conn = open_connection()
+            except Exception:
+                with _pool_lock:
+                    _pool_opened -= 1
+                raise
+        else:
+            conn = _pool.get()
+    try:
+        yield conn
+    finally:
+        _pool.put(conn)
+
+# All writes go through a single writer connection so WAL has one writer at a time
+_writer_conn = None
+_writer_lock = threading.Lock()
+
+@contextmanager
+def write_connection():
+    global _writer_conn
+    with _writer_lock:
+        if _writer_conn is None:
+            _writer_conn = open_connection()
+        conn = _writer_conn
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+# Function to close every connection opened by this module
+def close_all():
+    with _connections_lock:
+        while _connections:
+            conn = _connections.pop()
+            try:
+                # Re-analyzes tables whose statistics the queries on this connection found stale
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            conn.close()
+
+atexit.register(close_all)
+
+# Seconds between WAL checkpoints, which keep the -wal file from growing without bound
+WAL_CHECKPOINT_INTERVAL = int(os.getenv("WAL_CHECKPOINT_INTERVAL", "300"))
+
+_checkpoint_stop = threading.Event()
+_checkpoint_thread = None
+
+def _wal_checkpointer():
+    conn = open_connection()
+    # Give up quickly on busy readers instead of stalling writers; the next run retries
+    conn.execute("PRAGMA busy_timeout=1000")
+    while not _checkpoint_stop.wait(WAL_CHECKPOINT_INTERVAL):
+        try:
+            busy, wal_pages, moved = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            logger.debug("WAL checkpoint: busy=%s wal_pages=%s moved=%s", busy, wal_pages, moved)
+        except sqlite3.Error as e:
+            logger.warning("WAL checkpoint failed: %s", e)
+
+# Function to start the background WAL checkpoint thread once per process
+def start_wal_checkpointer():
+    global _checkpoint_thread
+    if _checkpoint_thread is None:
+        _checkpoint_thread = threading.Thread(target=_wal_checkpointer, name="wal-checkpoint", daemon=True)
+        _checkpoint_thread.start()
+
+# Function to stop the checkpoint thread before connections are closed
+def stop_wal_checkpointer():
+    _checkpoint_stop.set()
+    if _checkpoint_thread is not None:
+        _checkpoint_thread.join(timeout=5)
+
+# atexit runs handlers in reverse, so this stops the thread before close_all
+atexit.register(stop_wal_checkpointer)
@@ -0,0 +1,13 @@
+# Gunicorn settings for serving the Flask API in production.
+# Run from the backend directory: gunicorn app:app
+# Analyze requests spend almost all their time waiting on the Claude API,
+# so threaded workers let them overlap instead of queueing behind each other.
+
+bind = "0.0.0.0:5001"
+worker_class = "gthread"
+workers = 2
+threads = 16
+timeout = 120
+
+# Let gunicorn's file wrapper use sendfile(2) for send_file responses
+sendfile = True
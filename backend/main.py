@@ -3,9 +3,14 @@ import sys
 import time
 import datetime
 import cv2
-import base64
+import mmap
+import pybase64
 import requests
 import json
+import shutil
+import threading
+import atexit
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from wyzely import WyzeClient
 from pathlib import Path
@@ -66,35 +71,83 @@ def get_video_events(client, limit=5, days=7):
     print(f"Found {len(video_events)} events with videos")
     return video_events
 
+# Shared HTTP session so downloads and Claude calls reuse pooled connections
+_HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Chunk size used when streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Function to download a video from URL
 def download_video(video_url, output_path):
     print(f"Downloading video from {video_url[:50]}...")
-    response = requests.get(video_url, stream=True)
-    if response.status_code == 200:
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
-        print(f"Video saved to {output_path}")
-        return True
-    else:
-        print(f"Failed to download video: {response.status_code}")
+    try:
+        with _HTTP.get(video_url, stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            # Undo any Content-Encoding while copying the raw stream
+            response.raw.decode_content = True
+            with open(output_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+    except requests.RequestException as e:
+        print(f"Failed to download video: {str(e)}")
         return False
+    print(f"Video saved to {output_path}")
+    return True
 
-# Function to extract a frame at a specific time
-def extract_frame(video_path, time_seconds, output_path):
-    print(f"Extracting frame at {time_seconds} seconds...")
-    
-    try:
-        # Ensure OpenCV is imported
-        import cv2
-        
+# JPEG settings for extracted frames
+FRAME_JPEG_QUALITY = 85
+
+# Function to write bytes to a file on a dedicated thread so the caller is not blocked.
+# The thread is not a daemon, so the script waits for the write before exiting.
+def start_file_write_thread(path, data):
+    def write():
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+        except Exception as e:
+            print(f"Error writing {path}: {str(e)}")
+    thread = threading.Thread(target=write)
+    thread.start()
+    return thread
+
+# Open video captures, kept so repeated extractions from one video skip decoder setup.
+# A capture is not thread-safe, so the lock is held for as long as any capture is in use.
+_video_captures = {}
+_video_captures_lock = threading.RLock()
+
+# Function to get a cached video capture, opening it on first use; the caller must hold _video_captures_lock
+def get_video_capture(video_path):
+    cap = _video_captures.get(video_path)
+    if cap is None or not cap.isOpened():
+        cap = cv2.VideoCapture(video_path)
+        _video_captures[video_path] = cap
+    return cap
+
+# Function to release and forget a cached video capture
+def release_video_capture(video_path):
+    with _video_captures_lock:
+        cap = _video_captures.pop(video_path, None)
+        if cap is not None:
+            cap.release()
+
+# Function to release every cached video capture
+def release_all_video_captures():
+    with _video_captures_lock:
+        while _video_captures:
+            _video_captures.popitem()[1].release()
+
+atexit.register(release_all_video_captures)
+
+# Function to decode the frame at a specific time; returns None if it cannot be read
+def read_frame_at(video_path, time_seconds):
+    with _video_captures_lock:
         # Open the video file
         print(f"Opening video file: {video_path}")
-        cap = cv2.VideoCapture(video_path)
+        cap = get_video_capture(video_path)
         
         if not cap.isOpened():
             print(f"Error: Could not open video file at {video_path}")
+            release_video_capture(video_path)
             return None
         
         # Get video properties
@@ -109,69 +162,105 @@ def extract_frame(video_path, time_seconds, output_path):
             time_seconds = duration / 2  # Take middle frame if specified time exceeds duration
             print(f"Requested time exceeds video duration. Using {time_seconds:.2f} seconds instead.")
         
-        # Set frame position
+        # Seek by timestamp, which lands on or before the target frame
         frame_pos = int(time_seconds * fps)
         print(f"Seeking to frame position {frame_pos}")
-        success = cap.set(cv2.CAP_PROP_POS_FRAMES, frame_pos)
+        success = cap.set(cv2.CAP_PROP_POS_MSEC, time_seconds * 1000.0)
+        current_pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) if success else -1
+        if current_pos > frame_pos:
+            # Timestamp rounding can land just past the target; seek by frame index instead
+            success = cap.set(cv2.CAP_PROP_POS_FRAMES, frame_pos)
+            current_pos = frame_pos
         if not success:
             print(f"Warning: Failed to set frame position to {frame_pos}, trying alternative approach")
-            # Alternative approach: read frames until we reach the target position
+            # Alternative approach: step forward from the start of the video
             cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            for _ in range(frame_pos):
-                cap.read()
+            current_pos = 0
+        
+        # Skip to the target with grab(), which does not convert skipped frames to BGR
+        for _ in range(frame_pos - current_pos):
+            if not cap.grab():
+                break
         
         # Read the frame
         print("Reading frame")
-        ret, frame = cap.read()
+        ret = cap.grab()
+        if ret:
+            ret, frame = cap.retrieve()
         if not ret:
             print("Error: Failed to read frame")
-            cap.release()
+            release_video_capture(video_path)
             return None
+        return frame
+
+# Function to extract a frame at a specific time; returns (output_path, jpeg_bytes)
+def extract_frame(video_path, time_seconds, output_path):
+    print(f"Extracting frame at {time_seconds} seconds...")
+    
+    try:
+        frame = read_frame_at(video_path, time_seconds)
+        if frame is None:
+            return None, None
         
         # Ensure the output directory exists
         print(f"Creating output directory: {os.path.dirname(output_path)}")
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # Save the frame
-        print(f"Saving frame to {output_path}")
-        success = cv2.imwrite(output_path, frame)
+        # Encode the frame in memory; the bytes go straight to Claude
+        success, buffer = cv2.imencode(
+            ".jpg", frame,
+            [int(cv2.IMWRITE_JPEG_QUALITY), FRAME_JPEG_QUALITY, int(cv2.IMWRITE_JPEG_OPTIMIZE), 1]
+        )
         if not success:
-            print(f"Error: Failed to save frame to {output_path}")
-            cap.release()
-            return None
-            
-        print(f"Frame saved to {output_path}, size: {os.path.getsize(output_path)} bytes")
+            print("Error: Failed to encode frame")
+            return None, None
+        jpeg_bytes = buffer.tobytes()
+        
+        # Save the frame without waiting for the disk
+        print(f"Saving frame to {output_path}, size: {len(jpeg_bytes)} bytes")
+        start_file_write_thread(output_path, jpeg_bytes)
         
-        cap.release()
-        return output_path
+        return output_path, jpeg_bytes
     except Exception as e:
         print(f"Error in extract_frame: {str(e)}")
         import traceback
         traceback.print_exc()
-        return None
+        # The capture may be left mid-seek or broken; open a fresh one next time
+        release_video_capture(video_path)
+        return None, None
         
 # Function to encode image to base64
 def encode_image_to_base64(image_path):
     with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+        # mmap cannot map an empty file
+        if os.fstat(image_file.fileno()).st_size == 0:
+            return ""
+        # Map the file instead of reading it into a bytes copy; pybase64 uses SIMD where available
+        with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as image_map:
+            return pybase64.b64encode_as_string(image_map)
 
-# Function to analyze image with Claude
-def analyze_image_with_claude(image_path, prompt):
+# Function to analyze image with Claude; pass image_bytes to skip reading image_path back from disk
+def analyze_image_with_claude(image_path, prompt, image_bytes=None):
     print("Analyzing image with Claude API...")
     
     try:
-        # Check if the image exists and has content
-        if not os.path.exists(image_path):
-            return f"Error: Image file not found at {image_path}"
-        
-        if os.path.getsize(image_path) == 0:
-            return "Error: Image file is empty"
-        
-        # Encode image
-        try:
-            base64_image = encode_image_to_base64(image_path)
-        except Exception as e:
-            return f"Error: Failed to encode image: {str(e)}"
+        if image_bytes is not None:
+            if not image_bytes:
+                return "Error: Image file is empty"
+            base64_image = pybase64.b64encode_as_string(image_bytes)
+        else:
+            # Check if the image exists and has content
+            if not os.path.exists(image_path):
+                return f"Error: Image file not found at {image_path}"
+            
+            if os.path.getsize(image_path) == 0:
+                return "Error: Image file is empty"
+            
+            # Encode image
+            try:
+                base64_image = encode_image_to_base64(image_path)
+            except Exception as e:
+                return f"Error: Failed to encode image: {str(e)}"
         
         # Get API key
         api_key = os.getenv("ANTHROPIC_API_KEY")
@@ -210,7 +299,7 @@ def analyze_image_with_claude(image_path, prompt):
         }
         
         print("Sending request to Claude API...")
-        response = requests.post(
+        response = _HTTP.post(
             "https://api.anthropic.com/v1/messages",
             headers=headers,
             json=data,
@@ -274,7 +363,7 @@ def main():
     # Extract frame at 5 seconds into the video
     time_seconds = 5.0
     frame_path = f"output/frames/frame_{int(time.time())}.jpg"
-    frame_path = extract_frame(video_path, time_seconds, frame_path)
+    frame_path, frame_jpeg = extract_frame(video_path, time_seconds, frame_path)
     
     if frame_path:
         # Define the analysis prompt
@@ -289,7 +378,7 @@ def main():
         """
         
         # Analyze the frame with Claude
-        analysis = analyze_image_with_claude(frame_path, analysis_prompt)
+        analysis = analyze_image_with_claude(frame_path, analysis_prompt, frame_jpeg)
         
         # Save the analysis
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
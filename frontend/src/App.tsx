@@ -6,7 +6,7 @@ import AnalysisHistory from './components/AnalysisHistory';
 import AddStreamModal from './components/AddStreamModal';
 import PeopleDetectionGraph from './components/PeopleDetectionGraph';
 import api from './services/api';
-import type { AnalysisResult } from './services/api';
+import type { AnalysisResult, HistoryCursors } from './services/api';
 
 function App() {
   interface PeopleDataPoint {
@@ -16,6 +16,8 @@ function App() {
 
   const [currentTime, setCurrentTime] = useState(0);
   const [analysisHistory, setAnalysisHistory] = useState<AnalysisResult[]>([]);
+  const [historyCursors, setHistoryCursors] = useState<HistoryCursors | null>(null);
+  const [isLoadingMoreHistory, setIsLoadingMoreHistory] = useState(false);
   const [isProcessing, setIsProcessing] = useState(false);
   const [latestResult, setLatestResult] = useState<AnalysisResult | null>(null);
   const [backendStatus, setBackendStatus] = useState<string | null>(null);
@@ -163,15 +165,36 @@ function App() {
 
   const loadHistory = useCallback(async () => {
     try {
-      // Load both regular and stream history
-      const history = await api.getHistory('default', true);
-      setAnalysisHistory(history);
-      console.log(`Loaded ${history.length} history items`);
+      // Load the newest page of both regular and stream history
+      const { items, cursors } = await api.getHistory('default', true);
+      setAnalysisHistory(items);
+      setHistoryCursors(cursors);
+      console.log(`Loaded ${items.length} history items`);
     } catch (error) {
       console.error('Failed to load analysis history:', error);
     }
   }, []);
 
+  const hasMoreHistory = historyCursors !== null &&
+    (historyCursors.regular !== null || historyCursors.stream !== null);
+
+  const loadMoreHistory = useCallback(async () => {
+    if (!historyCursors || isLoadingMoreHistory) return;
+    setIsLoadingMoreHistory(true);
+    try {
+      // Older entries from whichever sources still have pages left
+      const { items, cursors } = await api.getHistory('default', true, historyCursors);
+      setAnalysisHistory(prev => {
+        const seen = new Set(prev.map(item => item.id));
+        const merged = [...prev, ...items.filter(item => !seen.has(item.id))];
+        return merged.sort((a, b) => b.timestamp.localeCompare(a.timestamp));
+      });
+      setHistoryCursors(cursors);
+    } finally {
+      setIsLoadingMoreHistory(false);
+    }
+  }, [historyCursors, isLoadingMoreHistory]);
+
   const handleAnalysisRequest = useCallback(async (time: number, prompt?: string) => {
     setIsProcessing(true);
     try {
@@ -398,7 +421,12 @@ function App() {
         
         {/* Analysis History */}
         <div className="mt-12">
-          <AnalysisHistory history={analysisHistory} />
+          <AnalysisHistory
+            history={analysisHistory}
+            hasMore={hasMoreHistory}
+            isLoadingMore={isLoadingMoreHistory}
+            onLoadMore={loadMoreHistory}
+          />
         </div>
       </div>
       
@@ -4,9 +4,12 @@ import api from '../services/api';
 
 interface AnalysisHistoryProps {
   history: AnalysisResult[];
+  hasMore?: boolean;
+  isLoadingMore?: boolean;
+  onLoadMore?: () => void;
 }
 
-export default function AnalysisHistory({ history }: AnalysisHistoryProps) {
+export default function AnalysisHistory({ history, hasMore = false, isLoadingMore = false, onLoadMore }: AnalysisHistoryProps) {
   const [expandedId, setExpandedId] = useState<number | null>(null);
   const [imageErrors, setImageErrors] = useState<Record<number, boolean>>({});
   
@@ -123,6 +126,17 @@ export default function AnalysisHistory({ history }: AnalysisHistoryProps) {
           </div>
         ))}
       </div>
+      {hasMore && onLoadMore && (
+        <div className="flex justify-center">
+          <button
+            onClick={onLoadMore}
+            disabled={isLoadingMore}
+            className="text-blue-600 hover:text-blue-800 disabled:text-gray-400"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
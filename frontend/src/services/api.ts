@@ -15,6 +15,35 @@ export interface AnalysisResult {
   device_id: string;
 }
 
+// One page of analysis history, newest first
+export interface HistoryPage {
+  items: AnalysisResult[];
+  next_cursor: string | null;
+}
+
+// Where the next page of each history source starts; null once a source is exhausted
+export interface HistoryCursors {
+  regular: string | null;
+  stream: string | null;
+}
+
+// Merged history entries plus the cursors for loading more
+export interface HistoryResult {
+  items: AnalysisResult[];
+  cursors: HistoryCursors;
+}
+
+const NO_MORE_HISTORY: HistoryCursors = { regular: null, stream: null };
+const EMPTY_HISTORY_PAGE: HistoryPage = { items: [], next_cursor: null };
+
+// Fetch one page of a history query, starting after the cursor when given
+const fetchHistoryPage = async (params: Record<string, string>, cursor?: string | null) => {
+  const response = await axios.get(`${API_URL}/history`, {
+    params: cursor ? { ...params, cursor } : params
+  });
+  return response.data as HistoryPage;
+};
+
 // Mock history data for dev mode
 const MOCK_HISTORY: AnalysisResult[] = [
   {
@@ -225,44 +254,46 @@ const api = {
   },
 
   // Get analysis history
-  getHistory: async (deviceId: string = 'default', includeStreams: boolean = true) => {
+  // Pass the cursors from a previous result to load the next page; omit them for the newest page
+  getHistory: async (
+    deviceId: string = 'default',
+    includeStreams: boolean = true,
+    cursors: HistoryCursors | null = null
+  ): Promise<HistoryResult> => {
     // Use mock data in development mode
     if (USE_DEV_MODE) {
       console.log('Using mock history data');
-      return MOCK_HISTORY;
+      return { items: MOCK_HISTORY, cursors: NO_MORE_HISTORY };
     }
     
     // Otherwise call the real API
     try {
-      // Make two requests - one for regular history and one for streams
-      let history: AnalysisResult[] = [];
+      // Make two requests - one for regular history and one for streams.
+      // When loading more, sources that have run out are skipped.
+      const loadRegular = !cursors || cursors.regular !== null;
+      const loadStreams = includeStreams && (!cursors || cursors.stream !== null);
+      const [regularPage, streamPage] = await Promise.all([
+        loadRegular ? fetchHistoryPage({ deviceId }, cursors?.regular) : EMPTY_HISTORY_PAGE,
+        loadStreams ? fetchHistoryPage({ isStream: 'true' }, cursors?.stream) : EMPTY_HISTORY_PAGE
+      ]);
       
-      // Get regular history
-      const response = await axios.get(`${API_URL}/history`, {
-        params: { deviceId }
-      });
-      history = response.data as AnalysisResult[];
+      // Combine the results
+      const history = [...regularPage.items, ...streamPage.items];
       
-      // Also get stream history if requested
-      if (includeStreams) {
-        const streamResponse = await axios.get(`${API_URL}/history`, {
-          params: { isStream: 'true' }
-        });
-        
-        // Combine the results
-        history = [...history, ...(streamResponse.data as AnalysisResult[])];
-        
-        // Sort by timestamp (newest first)
-        history.sort((a, b) => {
-          return b.timestamp.localeCompare(a.timestamp);
-        });
-      }
+      // Sort by timestamp (newest first)
+      history.sort((a, b) => {
+        return b.timestamp.localeCompare(a.timestamp);
+      });
       
       console.log(`Retrieved ${history.length} history items (including streams: ${includeStreams})`);
-      return history;
+      return {
+        items: history,
+        cursors: { regular: regularPage.next_cursor, stream: streamPage.next_cursor }
+      };
     } catch (error) {
       console.error('Error fetching history:', error);
-      return []; // Return empty array on error
+      // Keep any existing cursors so "load more" can be retried
+      return { items: [], cursors: cursors ?? NO_MORE_HISTORY };
     }
   },
     